@@ -1,12 +1,68 @@
+# Monkey-patch as early as possible so the blocking Gemini/DDG HTTPS calls
+# yield to the gevent event loop when running under gunicorn's gevent worker.
+# Harmless no-op in dev/test environments where gevent is not installed.
+try:
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:
+    pass
+
 import os
-from flask import Flask, render_template, request, jsonify
+import orjson
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from flask import Flask, render_template, request, Response, stream_with_context
 from flask_cors import CORS
 from gemini_client import GeminiClient
 import logging
+from logging.config import dictConfig
 
-logging.basicConfig(level=logging.INFO)
+# Single logging configuration for the whole app. Verbose SDK loggers are
+# capped at WARNING: their per-RPC INFO records otherwise pay formatting and
+# the logging lock on every request.
+dictConfig({
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'default'},
+    },
+    'root': {'level': os.environ.get('LOG_LEVEL', 'INFO'), 'handlers': ['console']},
+    'loggers': {
+        'grpc': {'level': 'WARNING'},
+        'google': {'level': 'WARNING'},
+        'httpx': {'level': 'WARNING'},
+        'urllib3': {'level': 'WARNING'},
+    },
+})
 logger = logging.getLogger(__name__)
 
+# Error payloads are static, so serialize them once at import time.
+ERR_NO_MESSAGE = (orjson.dumps({'status': 'error', 'error': 'No message provided'}), 400)
+ERR_TOO_LONG = (orjson.dumps({'status': 'error', 'error': 'Message too long'}), 400)
+ERR_NO_CLIENT = (orjson.dumps({'status': 'error', 'error': 'LLM client not available'}), 500)
+ERR_GENERATION = (orjson.dumps({'status': 'error', 'error': 'Error generating response'}), 500)
+ERR_TIMEOUT = (orjson.dumps({'status': 'error', 'error': 'Response generation timed out'}), 504)
+
+# Gemini calls run on a bounded pool so slow upstream latency cannot pin an
+# unbounded number of request threads; the request returns 504 on timeout.
+_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get('LLM_WORKERS', 32)))
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT', 25))
+
+# A full-length message plus JSON overhead fits comfortably in 4 KB, so larger
+# bodies can be rejected from the Content-Length header alone.
+MAX_BODY_BYTES = 4096
+
+# Message limit measured in UTF-8 bytes rather than characters: Gemini bills
+# tokens and the transport limit is bytes, and a 1000-char CJK/emoji message
+# can be several times larger than its character count suggests.
+MAX_MESSAGE_BYTES = 3000
+
+def json_response(body: bytes, status: int = 200) -> Response:
+    """Wrap pre-serialized JSON bytes in a Flask response."""
+    return Response(body, status=status, mimetype='application/json')
+
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 app = Flask(
     __name__,
@@ -14,11 +70,14 @@ app = Flask(
     static_folder=os.path.join(BASE_DIR, 'static')
 )
 CORS(app, resources={r"/api/*": {"origins": "*"}})
+# Werkzeug drops oversized bodies at the socket level before any route runs;
+# this also covers chunked requests that carry no Content-Length header.
+app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_BYTES
 
 try:
     client = GeminiClient()
 except Exception as e:
-    logger.error(f"GeminiClient initialization failed: {e}")
+    logger.error("GeminiClient initialization failed: %s", e)
     client = None
 
 @app.route('/')
@@ -31,6 +90,40 @@ def index():
     """
     return render_template('index.html')
 
+def read_user_message():
+    """
+    Validates the incoming chat request and extracts the user message.
+
+    Oversized bodies are rejected from the Content-Length header alone,
+    before any JSON parsing or allocation happens.
+
+    Returns:
+        tuple: (user_message, None) on success, or (None, Response) with the
+        error response the route should return.
+    """
+    content_length = request.content_length
+    if content_length is not None and content_length > MAX_BODY_BYTES:
+        return None, json_response(*ERR_TOO_LONG)
+
+    raw = request.get_data()
+    if len(raw) > MAX_BODY_BYTES:
+        return None, json_response(*ERR_TOO_LONG)
+    try:
+        payload = orjson.loads(raw or b'{}')
+    except orjson.JSONDecodeError:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    user_message = payload.get('message', '').strip()
+
+    if not user_message:
+        return None, json_response(*ERR_NO_MESSAGE)
+    if len(user_message.encode('utf-8')) > MAX_MESSAGE_BYTES:
+        return None, json_response(*ERR_TOO_LONG)
+    if client is None:
+        return None, json_response(*ERR_NO_CLIENT)
+    return user_message, None
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """
@@ -48,23 +141,61 @@ def chat():
         200: {'status': 'success', 'response': <response_text>}
         400: {'status': 'error', 'error': 'No message provided' or 'Message too long'}
         500: {'status': 'error', 'error': 'LLM client not available' or 'Error generating response'}
+        504: {'status': 'error', 'error': 'Response generation timed out'}
     """
-    payload = request.get_json(silent=True) or {}
-    user_message = payload.get('message', '').strip()
-
-    if not user_message:
-        return jsonify({'status': 'error', 'error': 'No message provided'}), 400
-    if len(user_message) > 1000:
-        return jsonify({'status': 'error', 'error': 'Message too long'}), 400
-    if client is None:
-        return jsonify({'status': 'error', 'error': 'LLM client not available'}), 500
+    user_message, error = read_user_message()
+    if error is not None:
+        return error
 
     try:
-        response_text = client.generate_response(user_message)
-        return jsonify({'status': 'success', 'response': response_text})
+        future = _EXECUTOR.submit(client.generate_response, user_message)
+        response_text = future.result(timeout=LLM_TIMEOUT_SECONDS)
+        logger.info(
+            "LLM cache stats: hits=%s misses=%s",
+            getattr(client, 'cache_hits', 0),
+            getattr(client, 'cache_misses', 0),
+        )
+        return json_response(
+            orjson.dumps({'status': 'success', 'response': response_text})
+        )
+    except FuturesTimeoutError:
+        logger.error("Response generation timed out after %ss", LLM_TIMEOUT_SECONDS)
+        return json_response(*ERR_TIMEOUT)
     except Exception as e:
-        logger.error(f"Error generating response: {e}")
-        return jsonify({'status': 'error', 'error': 'Error generating response'}), 500
+        logger.error("Error generating response: %s", e)
+        return json_response(*ERR_GENERATION)
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Handles chat requests like /api/chat, but streams the reply via
+    Server-Sent Events so the client sees text at single-token latency
+    instead of waiting for the full response.
+
+    Request JSON:
+        {
+            "message": "<user's message>"
+        }
+
+    Responses:
+        200: text/event-stream of 'data: {"delta": "<chunk>"}' events,
+             terminated by 'data: {"done": true}'
+        400/500: JSON errors matching /api/chat
+    """
+    user_message, error = read_user_message()
+    if error is not None:
+        return error
+
+    def generate():
+        try:
+            for piece in client.generate_response_stream(user_message):
+                yield b'data: ' + orjson.dumps({'delta': piece}) + b'\n\n'
+            yield b'data: ' + orjson.dumps({'done': True}) + b'\n\n'
+        except Exception as e:
+            logger.error("Error streaming response: %s", e)
+            yield b'data: ' + orjson.dumps({'error': 'Error generating response'}) + b'\n\n'
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
 if __name__ == '__main__':
     app.run(debug=os.environ.get("FLASK_DEBUG", "False") == "True")
\ No newline at end of file
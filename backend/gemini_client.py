@@ -1,21 +1,91 @@
 import os
+import re
+import copy
+import asyncio
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from typing import List, Dict
-import google.generativeai as genai
+import diskcache
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from duckduckgo_search import DDGS
+from semantic_cache import SemanticCache
+
+# google.generativeai (grpc/protobuf) and duckduckgo_search are imported
+# lazily at first use: together they add hundreds of ms and tens of MB RSS
+# to worker boot, which test paths that stub the client never need.
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 load_dotenv()
 
-def perform_web_search(query: str, max_results: int = 6) -> List[Dict[str, str]]:
+# Maximum number of entries kept in the exact-match response cache.
+RESPONSE_CACHE_SIZE = 1024
+
+# On-disk response cache tier: survives restarts and is shared between worker
+# processes on the same host. Entries expire after a day.
+DISK_CACHE_DIR = '/var/cache/study-planner'
+DISK_CACHE_SIZE_LIMIT = 2 << 30
+DISK_CACHE_TTL_SECONDS = 86400
+
+# Defensive prompt-size ceiling in UTF-8 bytes (the unit Gemini transport and
+# billing actually care about), independent of the HTTP-layer validation.
+MAX_PROMPT_BYTES = 3000
+
+# Matches the "search:" / "/search " triggers in one pass over the raw text,
+# capturing the query, instead of building lowered/stripped copies per call.
+_SEARCH_RE = re.compile(r'^\s*(?:search:\s*|/search\s+)(.*)', re.IGNORECASE | re.DOTALL)
+
+# Escapes Markdown reference brackets in one pass (vs chained .replace calls).
+_MD_ESCAPE = str.maketrans({'[': '\\[', ']': '\\]'})
+
+# The system prompt never changes, so the composed payload shares a bitwise-
+# identical prefix across requests — which also lets the provider reuse its
+# prompt cache for the leading tokens.
+_SYSTEM_PROMPT = (
+    "You are an AI research assistant. Use the provided web search results to answer the user query. "
+    "Synthesize concisely, cite sources inline like [1], [2] where relevant, and include a brief summary."
+)
+_COMPOSED_TMPL = (
+    f"<system>\n{_SYSTEM_PROMPT}\n</system>\n"
+    "<user_query>\n{q}\n</user_query>\n"
+    "<web_results>\n{r}\n</web_results>"
+)
+
+# Web-search results are stable over minutes, so repeated queries within the
+# TTL are served from memory instead of re-hitting DuckDuckGo.
+_SEARCH_CACHE: "TTLCache[tuple, List[Dict[str, str]]]" = TTLCache(maxsize=512, ttl=300)
+_SEARCH_CACHE_LOCK = threading.Lock()
+
+# Shared DDGS instance so successive searches reuse one HTTP session instead
+# of paying a fresh TCP+TLS handshake per call.
+_DDGS_LOCK = threading.Lock()
+_ddgs_instance = None
+
+def _get_ddgs():
+    """Return the shared DDGS instance, creating it on first use."""
+    global _ddgs_instance
+    with _DDGS_LOCK:
+        if _ddgs_instance is None:
+            from duckduckgo_search import DDGS
+            _ddgs_instance = DDGS()
+        return _ddgs_instance
+
+def _reset_ddgs() -> None:
+    """Drop the shared DDGS instance so the next search builds a fresh session."""
+    global _ddgs_instance
+    with _DDGS_LOCK:
+        _ddgs_instance = None
+
+def perform_web_search(query: str, max_results: int = 6, ddgs: "DDGS" = None) -> List[Dict[str, str]]:
     """
     Performs a DuckDuckGo web search for the given query and returns a list of search results.
 
     Args:
         query (str): The search query string.
         max_results (int, optional): Maximum number of results to return. Defaults to 6.
+        ddgs (DDGS, optional): Search client to use. Defaults to a shared
+            instance whose HTTP session is reused across calls.
 
     Returns:
         List[Dict[str, str]]: A list of dictionaries, each containing 'title', 'href', and 'body' keys
@@ -24,26 +94,61 @@ def perform_web_search(query: str, max_results: int = 6) -> List[Dict[str, str]]
     Notes:
         - The body text is truncated to 300 characters for brevity.
         - If an error occurs during the search, an empty list is returned and the error is logged.
+        - Successful results are cached for 5 minutes per (query, max_results);
+          cache hits return a deep copy so callers cannot mutate cached entries.
     """
     """Perform a DuckDuckGo search and return a list of results (title, href, body)."""
+    cache_key = (query, max_results)
+    with _SEARCH_CACHE_LOCK:
+        cached = _SEARCH_CACHE.get(cache_key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
     results: List[Dict[str, str]] = []
     try:
-        with DDGS() as ddgs:
-            for result in ddgs.text(query, max_results=max_results):
-                if not isinstance(result, dict):
-                    continue
-                title = result.get('title', '')
-                href = result.get('href', '')
-                body = result.get('body', '')
-                if title and href:
-                    # Limit body length for prompt brevity
-                    body = body[:300] + ('...' if len(body) > 300 else '')
-                    results.append({'title': title, 'href': href, 'body': body})
+        search_client = ddgs or _get_ddgs()
+        for result in search_client.text(query, max_results=max_results):
+            if not isinstance(result, dict):
+                continue
+            title = result.get('title', '')
+            href = result.get('href', '')
+            body = result.get('body', '')
+            if title and href:
+                # Limit body length for prompt brevity
+                if len(body) > 300:
+                    body = body[:300] + '...'
+                results.append({'title': title, 'href': href, 'body': body})
+        with _SEARCH_CACHE_LOCK:
+            _SEARCH_CACHE[cache_key] = copy.deepcopy(results)
         return results
     except Exception as e:
-        logger.error(f"DuckDuckGo search error: {e}")
+        logger.error("DuckDuckGo search error: %s", e)
+        # A failed session may be unusable (stale connection, rate limit);
+        # rebuild it on the next call rather than reusing it.
+        if ddgs is None:
+            _reset_ddgs()
         return []
 
+async def perform_web_search_many(queries: List[str], max_results: int = 6) -> List[List[Dict[str, str]]]:
+    """
+    Runs several DuckDuckGo searches concurrently and returns their results.
+
+    Args:
+        queries (List[str]): The search query strings.
+        max_results (int, optional): Maximum number of results per query. Defaults to 6.
+
+    Returns:
+        List[List[Dict[str, str]]]: One result list per query, in the same order
+        as the input queries.
+
+    Notes:
+        - Each search runs in a worker thread via `asyncio.to_thread`, so total
+          wall time is roughly the slowest single search rather than the sum.
+    """
+    return await asyncio.gather(
+        *(asyncio.to_thread(perform_web_search, query, max_results) for query in queries)
+    )
+
 """
 This module provides a GeminiClient class for interacting with Google's Gemini generative AI model,
 with optional integration of DuckDuckGo web search results to enhance responses. It includes:
@@ -61,7 +166,7 @@ Classes:
     using real-time web search results when triggered by specific user input patterns ("search:" or "/search ").
     - __init__(api_key: str = None, model_name: str = 'gemini-1.5-flash'):
         Initializes the GeminiClient with the provided API key and model name.
-        Configures the generative model and prepares chat history.
+        Configures the generative model for stateless content generation.
     - generate_response(user_input: str) -> str:
         Generates an AI response to the user input. If the input triggers a web search,
         performs the search, composes a context with numbered references, and instructs the AI
@@ -84,34 +189,76 @@ Dependencies:
 class GeminiClient:
     """Client for interacting with the Gemini AI model, with optional web search integration."""
     def __init__(self, api_key: str = None, model_name: str = 'gemini-1.5-flash'):
+        self.model_name = model_name
+        # Exact-match LRU cache of prior responses, keyed by a hash of
+        # (model name, prompt). Avoids a Gemini round-trip for repeated prompts.
+        self._resp_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_enabled = os.environ.get("LLM_CACHE_ENABLED", "True") == "True"
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Disk tier under the in-memory cache; lookup order is memory -> disk
+        # -> Gemini. Set LLM_CACHE_DIR="" to disable the disk tier.
+        self._disk_cache = None
+        cache_dir = os.environ.get('LLM_CACHE_DIR', DISK_CACHE_DIR)
+        if self._cache_enabled and cache_dir:
+            try:
+                self._disk_cache = diskcache.Cache(
+                    cache_dir,
+                    size_limit=DISK_CACHE_SIZE_LIMIT,
+                    eviction_policy='least-recently-used',
+                )
+            except Exception as e:
+                logger.error("Could not open disk response cache at %s: %s", cache_dir, e)
+        # Semantic cache catches paraphrased repeats the exact cache misses.
+        # It disables itself when the embedding dependencies are missing.
+        if os.environ.get("SEMANTIC_CACHE_ENABLED", "True") == "True":
+            self.semantic_cache = SemanticCache()
+        else:
+            self.semantic_cache = None
         api_key = api_key or os.getenv('GEMINI_API_KEY')
         if not api_key:
             logger.error("GEMINI_API_KEY is not set.")
-            self.chat = None
+            self.model = None
             return
         try:
+            import google.generativeai as genai
             genai.configure(api_key=api_key)
             self.model = genai.GenerativeModel(model_name)
-            self.chat = self.model.start_chat(history=[])
         except Exception as e:
-            logger.error(f"Error configuring Gemini API: {e}")
-            self.chat = None
+            logger.error("Error configuring Gemini API: %s", e)
+            self.model = None
+
+    def _store_local(self, cache_key: str, value: str) -> None:
+        """Insert a response into the in-memory LRU cache, evicting if full."""
+        self._resp_cache[cache_key] = value
+        self._resp_cache.move_to_end(cache_key)
+        while len(self._resp_cache) > RESPONSE_CACHE_SIZE:
+            self._resp_cache.popitem(last=False)
+
+    def _disk_cache_get(self, cache_key: str):
+        """Fetch a response from the disk tier, or None if absent/unavailable."""
+        if self._disk_cache is None:
+            return None
+        try:
+            return self._disk_cache.get(cache_key)
+        except Exception as e:
+            logger.error("Disk cache read failed: %s", e)
+            return None
 
     def generate_response(self, user_input: str) -> str:
         """Generate an AI response, optionally using web search if triggered."""
-        if not self.chat:
+        if not self.model:
             return "AI service is not configured correctly."
 
+        log_error = logger.error  # local binding keeps the hot path cheap
         try:
             text = user_input or ""
-            lower = text.strip().lower()
+            if len(text.encode('utf-8')) > MAX_PROMPT_BYTES:
+                return "Your message is too long. Please shorten it and try again."
 
             # Search trigger (case-insensitive, flexible)
-            search_query = None
-            if lower.startswith("search:"):
-                search_query = text.split(":", 1)[1].strip()
-            elif lower.startswith("/search "):
-                search_query = text.split(" ", 1)[1].strip()
+            match = _SEARCH_RE.match(text)
+            search_query = match.group(1).strip() if match else None
 
             if search_query:
                 web_results = perform_web_search(search_query, max_results=6)
@@ -119,28 +266,82 @@ class GeminiClient:
                     return "I could not retrieve web results right now. Please try again."
 
                 # Build context with numbered references, escape Markdown-sensitive chars
-                refs_lines = []
-                for idx, item in enumerate(web_results, start=1):
-                    title = item['title'].replace('[', '\\[').replace(']', '\\]')
-                    body = item['body'].replace('[', '\\[').replace(']', '\\]')
-                    refs_lines.append(f"[{idx}] {title} — {item['href']}\n{body}")
-                refs_block = "\n\n".join(refs_lines)
-
-                system_prompt = (
-                    "You are an AI research assistant. Use the provided web search results to answer the user query. "
-                    "Synthesize concisely, cite sources inline like [1], [2] where relevant, and include a brief summary."
-                )
-                composed = (
-                    f"<system>\n{system_prompt}\n</system>\n"
-                    f"<user_query>\n{search_query}\n</user_query>\n"
-                    f"<web_results>\n{refs_block}\n</web_results>"
+                refs_block = "\n\n".join(
+                    f"[{idx}] {item['title'].translate(_MD_ESCAPE)} — {item['href']}\n"
+                    f"{item['body'].translate(_MD_ESCAPE)}"
+                    for idx, item in enumerate(web_results, 1)
                 )
-                response = self.chat.send_message(composed)
+
+                composed = _COMPOSED_TMPL.format(q=search_query, r=refs_block)
+                response = self.model.generate_content(composed)
                 return response.text
 
-            # Default: normal chat
-            response = self.chat.send_message(text)
+            # Default: normal chat. Search-triggered responses are never cached
+            # (web results are non-deterministic), but identical plain prompts
+            # can be answered from the cache without hitting the API.
+            cache_key = None
+            if self._cache_enabled:
+                cache_key = hashlib.sha256(
+                    f"{self.model_name}\0{text}".encode()
+                ).hexdigest()
+                cached = self._resp_cache.get(cache_key)
+                if cached is not None:
+                    self.cache_hits += 1
+                    self._resp_cache.move_to_end(cache_key)
+                    return cached
+                cached = self._disk_cache_get(cache_key)
+                if cached is not None:
+                    self.cache_hits += 1
+                    self._store_local(cache_key, cached)
+                    return cached
+                self.cache_misses += 1
+
+            if self.semantic_cache is not None:
+                cached = self.semantic_cache.lookup(text)
+                if cached is not None:
+                    self.cache_hits += 1
+                    return cached
+
+            response = self.model.generate_content(text)
+            if self.semantic_cache is not None:
+                self.semantic_cache.add(text, response.text)
+            if cache_key is not None:
+                self._store_local(cache_key, response.text)
+                if self._disk_cache is not None:
+                    try:
+                        self._disk_cache.set(
+                            cache_key, response.text, expire=DISK_CACHE_TTL_SECONDS
+                        )
+                    except Exception as e:
+                        logger.error("Disk cache write failed: %s", e)
             return response.text
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            return "I'm sorry, I encountered an error while processing your request."
\ No newline at end of file
+            log_error("Error generating response: %s", e)
+            return "I'm sorry, I encountered an error while processing your request."
+
+    def generate_response_stream(self, user_input: str):
+        """
+        Yield chunks of the AI response as they arrive from the model.
+
+        Plain chat messages stream token chunks via the SDK's streaming API so
+        the first text reaches the client at single-token latency. Search-
+        triggered messages need the full web context composed up front, so they
+        fall back to yielding the complete response in one chunk.
+        """
+        if not self.model:
+            yield "AI service is not configured correctly."
+            return
+
+        text = user_input or ""
+        if _SEARCH_RE.match(text):
+            yield self.generate_response(text)
+            return
+
+        try:
+            response = self.model.generate_content(text, stream=True)
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error("Error streaming response: %s", e)
+            yield "I'm sorry, I encountered an error while processing your request."
\ No newline at end of file
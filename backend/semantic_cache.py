@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+
+# Micro-batching window for the embedder: concurrent encode requests arriving
+# within the window share one model.encode call, since the transformer's
+# per-call overhead dominates at batch size 1.
+EMBED_BATCH_SIZE = 32
+EMBED_BATCH_WINDOW_SECONDS = 0.01
+
+
+class _EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into batched model.encode calls.
+
+    Callers block in `encode` until a background worker thread has drained up
+    to EMBED_BATCH_SIZE queued prompts (waiting at most the batching window
+    for stragglers) and run them through the model in one forward pass.
+    """
+
+    def __init__(self, model, batch_size: int = EMBED_BATCH_SIZE,
+                 window: float = EMBED_BATCH_WINDOW_SECONDS):
+        self._model = model
+        self._batch_size = batch_size
+        self._window = window
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def encode(self, prompt: str):
+        """Embed one prompt, transparently sharing a batch with concurrent callers."""
+        done = threading.Event()
+        slot = {'done': done}
+        self._queue.put((prompt, slot))
+        done.wait()
+        if 'error' in slot:
+            raise slot['error']
+        return slot['vector']
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                vectors = self._model.encode(
+                    prompts, batch_size=self._batch_size, normalize_embeddings=True
+                )
+            except Exception as e:
+                for _, slot in batch:
+                    slot['error'] = e
+                    slot['done'].set()
+                continue
+            for (_, slot), vector in zip(batch, vectors):
+                slot['vector'] = np.asarray(vector, dtype=np.float32)
+                slot['done'].set()
+
+
+class SemanticCache:
+    """
+    Embedding-similarity cache for chat prompts.
+
+    Stores (prompt, response) pairs together with L2-normalized sentence
+    embeddings. A lookup embeds the incoming prompt and returns the stored
+    response of the nearest prior prompt when its cosine similarity exceeds
+    the threshold, so paraphrased repeats ("explain photosynthesis" vs
+    "what is photosynthesis") can be answered without an API call.
+
+    The cache degrades gracefully: if sentence-transformers or numpy is not
+    installed, or the embedding model cannot be loaded, `enabled` stays False
+    and `lookup`/`add` become no-ops. When `cache_dir` (or the
+    SEMANTIC_CACHE_DIR environment variable) is set, entries are persisted to
+    disk from a background thread and reloaded on startup.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME,
+                 threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 cache_dir: str = None):
+        self.threshold = threshold
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._entries: List[Tuple[str, str]] = []
+        self._vectors = None  # (N, dim) float32 matrix, rows L2-normalized
+        self._cache_dir = cache_dir or os.getenv('SEMANTIC_CACHE_DIR')
+
+        if np is None or SentenceTransformer is None:
+            logger.warning("numpy/sentence-transformers not installed; semantic cache disabled.")
+            return
+        try:
+            self._model = SentenceTransformer(model_name, cache_folder=self._cache_dir)
+        except Exception as e:
+            logger.error("Could not load embedding model '%s': %s", model_name, e)
+            return
+        self._batcher = _EmbeddingBatcher(self._model)
+        self.enabled = True
+        self._load()
+
+    def lookup(self, prompt: str) -> Optional[str]:
+        """Return the cached response for the most similar prior prompt, or None."""
+        if not self.enabled:
+            return None
+        try:
+            vec = self._encode(prompt)
+            with self._lock:
+                if self._vectors is None or len(self._entries) == 0:
+                    return None
+                similarities = self._vectors @ vec
+                best = int(similarities.argmax())
+                if similarities[best] > self.threshold:
+                    return self._entries[best][1]
+        except Exception as e:
+            logger.error("Semantic cache lookup failed: %s", e)
+        return None
+
+    def add(self, prompt: str, response: str) -> None:
+        """Store a (prompt, response) pair and persist the cache if configured."""
+        if not self.enabled:
+            return
+        try:
+            vec = self._encode(prompt)
+            with self._lock:
+                self._entries.append((prompt, response))
+                row = vec.reshape(1, -1)
+                if self._vectors is None:
+                    self._vectors = row
+                else:
+                    self._vectors = np.vstack([self._vectors, row])
+            if self._cache_dir:
+                threading.Thread(target=self._save, daemon=True).start()
+        except Exception as e:
+            logger.error("Semantic cache add failed: %s", e)
+
+    def _encode(self, prompt: str):
+        if self._batcher is not None:
+            return self._batcher.encode(prompt)
+        return self._model.encode(
+            [prompt], normalize_embeddings=True
+        )[0].astype(np.float32)
+
+    def _paths(self) -> Tuple[str, str]:
+        return (
+            os.path.join(self._cache_dir, 'semantic_cache_entries.json'),
+            os.path.join(self._cache_dir, 'semantic_cache_vectors.npy'),
+        )
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            entries_path, vectors_path = self._paths()
+            with self._lock:
+                entries = list(self._entries)
+                vectors = None if self._vectors is None else self._vectors.copy()
+            with open(entries_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            if vectors is not None:
+                np.save(vectors_path, vectors)
+        except Exception as e:
+            logger.error("Semantic cache persistence failed: %s", e)
+
+    def _load(self) -> None:
+        if not self._cache_dir:
+            return
+        entries_path, vectors_path = self._paths()
+        if not (os.path.exists(entries_path) and os.path.exists(vectors_path)):
+            return
+        try:
+            with open(entries_path, 'r', encoding='utf-8') as f:
+                entries = [tuple(pair) for pair in json.load(f)]
+            vectors = np.load(vectors_path).astype(np.float32)
+            if len(entries) == vectors.shape[0]:
+                self._entries = entries
+                self._vectors = vectors
+        except Exception as e:
+            logger.error("Semantic cache load failed: %s", e)
@@ -25,13 +25,23 @@ def test_chat_no_message(client):
     assert 'No message provided' in data['error']
 
 def test_chat_message_too_long(client):
-    long_message = 'a' * 1001
+    long_message = 'a' * 3001
     response = client.post('/api/chat', json={'message': long_message})
     assert response.status_code == 400
     data = response.get_json()
     assert data['status'] == 'error'
     assert 'Message too long' in data['error']
 
+def test_chat_message_too_long_multibyte(client):
+    # 2000 chars but 4000 UTF-8 bytes; the limit is measured in bytes.
+    import json
+    body = json.dumps({'message': 'é' * 2000}, ensure_ascii=False).encode('utf-8')
+    response = client.post('/api/chat', data=body, content_type='application/json')
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data['status'] == 'error'
+    assert 'Message too long' in data['error']
+
 def test_chat_llm_client_unavailable(monkeypatch, client):
     monkeypatch.setattr('app.client', None)
     response = client.post('/api/chat', json={'message': 'Hello'})
@@ -40,6 +50,50 @@ def test_chat_llm_client_unavailable(monkeypatch, client):
     assert data['status'] == 'error'
     assert 'LLM client not available' in data['error']
 
+def test_chat_oversized_body_rejected(client):
+    # Larger than MAX_BODY_BYTES; rejected from Content-Length before parsing.
+    response = client.post(
+        '/api/chat',
+        data=b'x' * 8192,
+        content_type='application/json',
+    )
+    assert response.status_code in (400, 413)
+
+def test_chat_timeout(monkeypatch, client):
+    import time
+    class SlowClient:
+        def generate_response(self, msg):
+            time.sleep(0.5)
+            return "late"
+    monkeypatch.setattr('app.client', SlowClient())
+    monkeypatch.setattr('app.LLM_TIMEOUT_SECONDS', 0.01)
+    response = client.post('/api/chat', json={'message': 'Hello'})
+    assert response.status_code == 504
+    data = response.get_json()
+    assert data['status'] == 'error'
+    assert 'timed out' in data['error']
+
+def test_chat_stream_no_message(client):
+    response = client.post('/api/chat/stream', json={})
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data['status'] == 'error'
+    assert 'No message provided' in data['error']
+
+def test_chat_stream_success(monkeypatch, client):
+    class DummyClient:
+        def generate_response_stream(self, msg):
+            yield "Hello "
+            yield "world"
+    monkeypatch.setattr('app.client', DummyClient())
+    response = client.post('/api/chat/stream', json={'message': 'Hi'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    assert 'data: {"delta":"Hello "}' in body
+    assert 'data: {"delta":"world"}' in body
+    assert 'data: {"done":true}' in body
+
 def test_chat_success(monkeypatch, client):
     class DummyClient:
         def generate_response(self, msg):
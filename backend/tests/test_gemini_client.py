@@ -0,0 +1,135 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gemini_client import GeminiClient
+
+
+class DummyResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class DummyModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, text):
+        self.calls += 1
+        return DummyResponse(f"reply-{self.calls}")
+
+
+def make_client():
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "False"
+    os.environ["LLM_CACHE_DIR"] = ""
+    client = GeminiClient(api_key=None)
+    client.model = DummyModel()
+    return client
+
+
+def test_repeated_prompt_served_from_cache():
+    client = make_client()
+    first = client.generate_response("Hello")
+    second = client.generate_response("Hello")
+    assert first == second
+    assert client.model.calls == 1
+    assert client.cache_hits == 1
+    assert client.cache_misses == 1
+
+
+def test_distinct_prompts_not_cached_together():
+    client = make_client()
+    assert client.generate_response("Hello") != client.generate_response("Goodbye")
+    assert client.model.calls == 2
+
+
+@pytest.mark.parametrize("message", [
+    "search: python asyncio",
+    "SEARCH: python asyncio",
+    "/search python asyncio",
+    "  search:   python asyncio  ",
+])
+def test_search_trigger_extracts_query(monkeypatch, message):
+    client = make_client()
+    captured = {}
+
+    def fake_search(query, max_results=6):
+        captured['query'] = query
+        return []
+
+    monkeypatch.setattr('gemini_client.perform_web_search', fake_search)
+    client.generate_response(message)
+    assert captured['query'] == 'python asyncio'
+    assert client.model.calls == 0
+
+
+def test_plain_message_does_not_trigger_search(monkeypatch):
+    client = make_client()
+    monkeypatch.setattr(
+        'gemini_client.perform_web_search',
+        lambda *a, **k: pytest.fail("search should not run"),
+    )
+    client.generate_response("Tell me about searching algorithms")
+    assert client.model.calls == 1
+
+
+def test_perform_web_search_many_preserves_order(monkeypatch):
+    import asyncio
+    import gemini_client
+
+    def fake_search(query, max_results=6):
+        return [{'title': query, 'href': f'https://example.com/{query}', 'body': ''}]
+
+    monkeypatch.setattr('gemini_client.perform_web_search', fake_search)
+    results = asyncio.run(gemini_client.perform_web_search_many(['alpha', 'beta']))
+    assert [r[0]['title'] for r in results] == ['alpha', 'beta']
+
+
+def test_perform_web_search_uses_ttl_cache(monkeypatch):
+    import gemini_client
+
+    gemini_client._SEARCH_CACHE.clear()
+    calls = {'count': 0}
+
+    class FakeDDGS:
+        def text(self, query, max_results=6):
+            calls['count'] += 1
+            return [{'title': 'Title', 'href': 'https://example.com', 'body': 'snippet'}]
+
+    monkeypatch.setattr('gemini_client._ddgs_instance', FakeDDGS())
+    first = gemini_client.perform_web_search('python')
+    second = gemini_client.perform_web_search('python')
+    assert calls['count'] == 1
+    assert first == second
+
+    # Cache hits return copies, so mutating a result must not poison the cache.
+    second[0]['title'] = 'mutated'
+    assert gemini_client.perform_web_search('python')[0]['title'] == 'Title'
+
+
+def test_disk_cache_survives_new_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "False")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+
+    first = GeminiClient(api_key=None)
+    first.model = DummyModel()
+    reply = first.generate_response("Hello")
+
+    # A fresh client (simulating a restarted worker) hits the disk tier.
+    second = GeminiClient(api_key=None)
+    second.model = DummyModel()
+    assert second.generate_response("Hello") == reply
+    assert second.model.calls == 0
+    assert second.cache_hits == 1
+
+
+def test_cache_disabled_via_env(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "False")
+    client = make_client()
+    client.generate_response("Hello")
+    client.generate_response("Hello")
+    assert client.model.calls == 2
+    assert client.cache_hits == 0
@@ -0,0 +1,100 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+np = pytest.importorskip("numpy")
+
+from semantic_cache import SemanticCache
+
+
+class DummyModel:
+    """Maps known prompts to fixed unit vectors so similarity is deterministic."""
+
+    VECTORS = {
+        "explain photosynthesis": [1.0, 0.0],
+        "what is photosynthesis": [0.99498744, 0.1],
+        "capital of france": [0.0, 1.0],
+    }
+
+    def encode(self, prompts, normalize_embeddings=True, **kwargs):
+        rows = [self.VECTORS[p] for p in prompts]
+        vectors = np.asarray(rows, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / norms
+
+
+def make_cache():
+    cache = SemanticCache.__new__(SemanticCache)
+    cache.threshold = 0.92
+    cache.enabled = True
+    cache._entries = []
+    cache._vectors = None
+    cache._cache_dir = None
+    cache._model = DummyModel()
+    cache._batcher = None
+    import threading
+    cache._lock = threading.Lock()
+    return cache
+
+
+def test_lookup_empty_cache_returns_none():
+    cache = make_cache()
+    assert cache.lookup("explain photosynthesis") is None
+
+
+def test_near_duplicate_prompt_hits():
+    cache = make_cache()
+    cache.add("explain photosynthesis", "Plants convert light to energy.")
+    assert cache.lookup("what is photosynthesis") == "Plants convert light to energy."
+
+
+def test_dissimilar_prompt_misses():
+    cache = make_cache()
+    cache.add("explain photosynthesis", "Plants convert light to energy.")
+    assert cache.lookup("capital of france") is None
+
+
+def test_embedding_batcher_coalesces_concurrent_requests():
+    import threading
+    from semantic_cache import _EmbeddingBatcher
+
+    class CountingModel(DummyModel):
+        def __init__(self):
+            self.batch_sizes = []
+
+        def encode(self, prompts, **kwargs):
+            self.batch_sizes.append(len(prompts))
+            return super().encode(prompts, **kwargs)
+
+    model = CountingModel()
+    batcher = _EmbeddingBatcher(model, window=0.05)
+    prompts = list(DummyModel.VECTORS)
+    results = {}
+
+    def worker(prompt):
+        results[prompt] = batcher.encode(prompt)
+
+    threads = [threading.Thread(target=worker, args=(p,)) for p in prompts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    batcher_calls = list(model.batch_sizes)
+    # Every prompt was embedded exactly once across the batched calls.
+    assert sum(batcher_calls) == len(prompts)
+    assert len(batcher_calls) <= len(prompts)
+    # Each caller gets its own (normalized) vector back.
+    for prompt in prompts:
+        expected = DummyModel().encode([prompt])[0]
+        assert np.allclose(results[prompt], expected)
+
+
+def test_disabled_cache_is_noop():
+    cache = make_cache()
+    cache.enabled = False
+    cache.add("explain photosynthesis", "whatever")
+    assert cache.lookup("explain photosynthesis") is None
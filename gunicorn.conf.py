@@ -0,0 +1,13 @@
+import os
+
+# Serve the Flask app from backend/ with gevent workers: each worker handles
+# up to `worker_connections` concurrent I/O-bound chat requests via greenlets
+# instead of serializing them like the Werkzeug dev server.
+chdir = 'backend'
+bind = os.getenv('BIND', '0.0.0.0:8000')
+worker_class = 'gevent'
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_connections = 200
+timeout = 60
+# Load the app (and GeminiClient) once in the master before forking workers.
+preload_app = True